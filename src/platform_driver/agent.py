@@ -22,8 +22,8 @@
 # ===----------------------------------------------------------------------===
 # }}}
 
-import bisect
 import fnmatch
+import heapq
 import logging
 import resource
 import sys
@@ -176,6 +176,7 @@ class PlatformDriverAgent(Agent):
         self._override_devices = set()
         self._override_patterns = None
         self._override_interval_events = {}
+        self._main_config = None
 
         if scalability_test:
             self.waiting_to_finish = set()
@@ -204,8 +205,12 @@ class PlatformDriverAgent(Agent):
         self.vip.config.subscribe(self.remove_driver, actions="DELETE", pattern="devices/*")
 
     def configure_main(self, config_name, action, contents):
-        config = self.default_config.copy()
-        config.update(contents)
+        config = {**self.default_config, **contents}
+
+        if action == "UPDATE" and config == self._main_config:
+            _log.debug("Platform driver configuration unchanged, nothing to update.")
+            return
+        self._main_config = config
 
         if action == "NEW":
             try:
@@ -213,12 +218,12 @@ class PlatformDriverAgent(Agent):
                 if self.max_open_sockets is not None:
                     max_open_sockets = int(self.max_open_sockets)
                     configure_socket_lock(max_open_sockets)
-                    _log.info("maximum concurrently open sockets limited to " +
-                              str(max_open_sockets))
+                    _log.info("maximum concurrently open sockets limited to %d", max_open_sockets)
                 elif self.system_socket_limit is not None:
                     max_open_sockets = int(self.system_socket_limit * 0.8)
-                    _log.info("maximum concurrently open sockets limited to " +
-                              str(max_open_sockets) + " (derived from system limits)")
+                    _log.info(
+                        "maximum concurrently open sockets limited to %d "
+                        "(derived from system limits)", max_open_sockets)
                     configure_socket_lock(max_open_sockets)
                 else:
                     configure_socket_lock()
@@ -235,8 +240,8 @@ class PlatformDriverAgent(Agent):
                         "Consider setting max_concurrent_publishes if you plan to work with many devices."
                     )
                 else:
-                    _log.info("maximum concurrent driver publishes limited to " +
-                              str(max_concurrent_publishes))
+                    _log.info("maximum concurrent driver publishes limited to %d",
+                              max_concurrent_publishes)
                 configure_publish_lock(max_concurrent_publishes)
 
                 self.scalability_test = bool(config["scalability_test"])
@@ -250,20 +255,16 @@ class PlatformDriverAgent(Agent):
 
             except ValueError as e:
                 _log.error(
-                    "ERROR PROCESSING STARTUP CRITICAL CONFIGURATION SETTINGS: {}".format(e))
+                    "ERROR PROCESSING STARTUP CRITICAL CONFIGURATION SETTINGS: %s", e)
                 _log.error("Platform driver SHUTTING DOWN")
                 sys.exit(1)
 
         else:
-            if self.max_open_sockets != config["max_open_sockets"]:
-                _log.info(
-                    "The platform driver must be restarted for changes to the max_open_sockets setting to take "
-                    "effect")
-
-            if self.max_concurrent_publishes != config["max_concurrent_publishes"]:
-                _log.info(
-                    "The platform driver must be restarted for changes to the max_concurrent_publishes setting to "
-                    "take effect")
+            for setting in ("max_open_sockets", "max_concurrent_publishes"):
+                if getattr(self, setting) != config[setting]:
+                    _log.info(
+                        "The platform driver must be restarted for changes to the %s setting to "
+                        "take effect", setting)
 
             if self.scalability_test != bool(config["scalability_test"]):
                 if not self.scalability_test:
@@ -291,9 +292,8 @@ class PlatformDriverAgent(Agent):
 
                 if isinstance(values, dict):
                     self._override_patterns = set()
+                    now = get_aware_utc_now()
                     for pattern, end_time in values.items():
-                        # check the end_time
-                        now = get_aware_utc_now()
                         # If end time is indefinite, set override with indefinite duration
                         if end_time == "0.0":
                             self._set_override_on(pattern, 0.0, from_config_store=True)
@@ -315,15 +315,17 @@ class PlatformDriverAgent(Agent):
         try:
             driver_scrape_interval = float(config["driver_scrape_interval"])
         except ValueError as e:
-            _log.error("ERROR PROCESSING CONFIGURATION: {}".format(e))
+            _log.error("ERROR PROCESSING CONFIGURATION: %s", e)
             _log.error("Platform driver scrape interval settings unchanged")
+            driver_scrape_interval = self.driver_scrape_interval
             # TODO: set a health status for the agent
 
         try:
             group_offset_interval = float(config["group_offset_interval"])
         except ValueError as e:
-            _log.error("ERROR PROCESSING CONFIGURATION: {}".format(e))
+            _log.error("ERROR PROCESSING CONFIGURATION: %s", e)
             _log.error("Platform driver group interval settings unchanged")
+            group_offset_interval = self.group_offset_interval
             # TODO: set a health status for the agent
 
         if self.scalability_test and action == "UPDATE":
@@ -335,8 +337,8 @@ class PlatformDriverAgent(Agent):
             self.driver_scrape_interval = driver_scrape_interval
             self.group_offset_interval = group_offset_interval
 
-            _log.info("Setting time delta between driver device scrapes to  " +
-                      str(driver_scrape_interval))
+            _log.info("Setting time delta between driver device scrapes to %s",
+                      driver_scrape_interval)
 
             # Reset all scrape schedules
             self.freed_time_slots.clear()
@@ -347,16 +349,20 @@ class PlatformDriverAgent(Agent):
                                               self.group_offset_interval)
                 self.group_counts[driver.group] += 1
 
+        old_publish_types = (self.publish_depth_first_all, self.publish_breadth_first_all,
+                             self.publish_depth_first, self.publish_breadth_first)
+
         self.publish_depth_first_all = bool(config["publish_depth_first_all"])
         self.publish_breadth_first_all = bool(config["publish_breadth_first_all"])
         self.publish_depth_first = bool(config["publish_depth_first"])
         self.publish_breadth_first = bool(config["publish_breadth_first"])
 
-        # Update the publish settings on running devices.
-        for driver in self.instances.values():
-            driver.update_publish_types(self.publish_depth_first_all,
-                                        self.publish_breadth_first_all, self.publish_depth_first,
-                                        self.publish_breadth_first)
+        publish_types = (self.publish_depth_first_all, self.publish_breadth_first_all,
+                         self.publish_depth_first, self.publish_breadth_first)
+        if publish_types != old_publish_types:
+            # Update the publish settings on running devices.
+            for driver in self.instances.values():
+                driver.update_publish_types(*publish_types)
 
     def derive_device_topic(self, config_name):
         _, topic = config_name.split('/', 1)
@@ -370,34 +376,30 @@ class PlatformDriverAgent(Agent):
         if driver is None:
             return
 
-        _log.info("Stopping driver: {}".format(real_name))
+        _log.info("Stopping driver: %s", real_name)
 
         try:
             driver.core.stop(timeout=5.0)
         except Exception as e:
-            _log.error("Failure during {} driver shutdown: {}".format(real_name, e))
+            _log.error("Failure during %s driver shutdown: %s", real_name, e)
 
-        bisect.insort(self.freed_time_slots[driver.group], driver.time_slot)
+        heapq.heappush(self.freed_time_slots[driver.group], driver.time_slot)
         self.group_counts[driver.group] -= 1
 
     def update_driver(self, config_name, action, contents):
-        _log.info("In update_driver")
         topic = self.derive_device_topic(config_name)
         self.stop_driver(topic)
 
         group = int(contents.get("group", 0))
 
-        slot = self.group_counts[group]
-
-        if self.freed_time_slots[group]:
-            slot = self.freed_time_slots[group].pop(0)
+        freed_slots = self.freed_time_slots[group]
+        slot = heapq.heappop(freed_slots) if freed_slots else self.group_counts[group]
 
-        _log.info("Starting driver: {}".format(topic))
+        _log.info("Starting driver: %s", topic)
         driver = DriverAgent(self, contents, slot, self.driver_scrape_interval, topic, group,
                              self.group_offset_interval, self.publish_depth_first_all,
                              self.publish_breadth_first_all, self.publish_depth_first,
                              self.publish_breadth_first)
-        _log.debug("SPAWNING GREENLET....")
         gevent.spawn(driver.core.run)
         self.instances[topic] = driver
         self.group_counts[group] += 1
@@ -425,8 +427,8 @@ class PlatformDriverAgent(Agent):
 
         if topic not in self.waiting_to_finish:
             _log.warning(
-                f"{topic} started twice before test finished, increase the length of scrape interval and rerun test"
-            )
+                "%s started twice before test finished, increase the length of scrape "
+                "interval and rerun test", topic)
 
     def scrape_ending(self, topic):
         if not self.scalability_test:
@@ -436,8 +438,8 @@ class PlatformDriverAgent(Agent):
             self.waiting_to_finish.remove(topic)
         except KeyError:
             _log.warning(
-                f"{topic} published twice before test finished, increase the length of scrape interval and rerun test"
-            )
+                "%s published twice before test finished, increase the length of scrape "
+                "interval and rerun test", topic)
 
         if not self.waiting_to_finish:
             end = datetime.now()
@@ -447,14 +449,14 @@ class PlatformDriverAgent(Agent):
 
             self.test_iterations += 1
 
-            _log.info("publish {} took {} seconds".format(self.test_iterations, delta))
+            _log.info("publish %d took %s seconds", self.test_iterations, delta)
 
             if self.test_iterations >= self.scalability_test_iterations:
                 # Test is now over. Button it up and shutdown.
                 mean_t = mean(self.test_results)
                 stdev_t = stdev(self.test_results)
-                _log.info("Mean total publish time: " + str(mean_t))
-                _log.info("Std dev publish time: " + str(stdev_t))
+                _log.info("Mean total publish time: %s", mean_t)
+                _log.info("Std dev publish time: %s", stdev_t)
                 sys.exit(0)
 
     @RPC.export
@@ -485,11 +487,8 @@ class PlatformDriverAgent(Agent):
         :param kwargs: additional arguments for the device
         :type kwargs: arguments pointer
         """
-        if path in self._override_devices:
-            raise OverrideError(
-                "Cannot set point on device {} since global override is set".format(path))
-        else:
-            return self.instances[path].set_point(point_name, value, **kwargs)
+        self._raise_on_override(path, "set point on device")
+        return self.instances[path].set_point(point_name, value, **kwargs)
 
     @RPC.export
     def scrape_all(self, path):
@@ -511,11 +510,8 @@ class PlatformDriverAgent(Agent):
         :param kwargs: additional arguments for the device
         :type kwargs: arguments pointer
         """
-        if path in self._override_devices:
-            raise OverrideError(
-                "Cannot set point on device {} since global override is set".format(path))
-        else:
-            return self.instances[path].set_multiple_points(point_names_values, **kwargs)
+        self._raise_on_override(path, "set point on device")
+        return self.instances[path].set_multiple_points(point_names_values, **kwargs)
 
     @RPC.export
     def heart_beat(self):
@@ -523,9 +519,29 @@ class PlatformDriverAgent(Agent):
 
         Sends heartbeat to all devices
         """
-        _log.debug("sending heartbeat")
-        for device in self.instances.values():
+        heart_beat_timeout = 10.0    # sec
+        greenlets = {
+            topic: gevent.spawn(self._heart_beat_device, topic, device)
+            for topic, device in self.instances.items()
+        }
+        gevent.joinall(greenlets.values(), timeout=heart_beat_timeout)
+        pending = [topic for topic, greenlet in greenlets.items() if not greenlet.ready()]
+        if pending:
+            _log.warning("Heartbeat did not complete within %s seconds for: %s",
+                         heart_beat_timeout, ", ".join(pending))
+
+    def _heart_beat_device(self, topic, device):
+        """
+        Send a heartbeat to one device
+        :param topic: device path
+        :type topic: str
+        :param device: driver of the device
+        :type device: DriverAgent
+        """
+        try:
             device.heart_beat()
+        except Exception as e:
+            _log.error("Heartbeat failed for %s: %s", topic, e)
 
     @RPC.export
     def revert_point(self, path, point_name, **kwargs):
@@ -540,11 +556,8 @@ class PlatformDriverAgent(Agent):
         :param kwargs: additional arguments for the device
         :type kwargs: arguments pointer
         """
-        if path in self._override_devices:
-            raise OverrideError(
-                "Cannot revert point on device {} since global override is set".format(path))
-        else:
-            self.instances[path].revert_point(point_name, **kwargs)
+        self._raise_on_override(path, "revert point on device")
+        self.instances[path].revert_point(point_name, **kwargs)
 
     @RPC.export
     def revert_device(self, path, **kwargs):
@@ -557,11 +570,8 @@ class PlatformDriverAgent(Agent):
         :param kwargs: additional arguments for the device
         :type kwargs: arguments pointer
         """
-        if path in self._override_devices:
-            raise OverrideError(
-                "Cannot revert device {} since global override is set".format(path))
-        else:
-            self.instances[path].revert_all(**kwargs)
+        self._raise_on_override(path, "revert device")
+        self.instances[path].revert_all(**kwargs)
 
     @RPC.export
     def set_override_on(self, pattern, duration=0.0, failsafe_revert=True, staggered_revert=False):
@@ -609,32 +619,34 @@ class PlatformDriverAgent(Agent):
         stagger_interval = 0.05    # sec
         # Add to override patterns set
         self._override_patterns.add(pattern)
-        i = 0
-        for name in self.instances.keys():
-            i += 1
-            if fnmatch.fnmatch(name, pattern):
-                # If revert to default state is needed
-                if failsafe_revert:
-                    if staggered_revert:
-                        self.core.spawn_later(i * stagger_interval,
-                                              self.instances[name].revert_all())
-                    else:
-                        self.core.spawn(self.instances[name].revert_all())
-                # Set override
-                self._override_devices.add(name)
+        for i, name in enumerate(fnmatch.filter(self.instances, pattern), 1):
+            # If revert to default state is needed
+            if failsafe_revert:
+                if staggered_revert:
+                    self.core.spawn_later(i * stagger_interval, self._failsafe_revert, name)
+                else:
+                    self.core.spawn(self._failsafe_revert, name)
+            # Set override
+            self._override_devices.add(name)
         # Set timer for interval of override condition
         config_update = self._update_override_interval(duration, pattern)
         if config_update and not from_config_store:
             # Update config store
-            patterns = dict()
-            for pat in self._override_patterns:
-                if self._override_interval_events[pat] is None:
-                    patterns[pat] = str(0.0)
-                else:
-                    evt, end_time = self._override_interval_events[pat]
-                    patterns[pat] = format_timestamp(end_time)
+            self._store_override_patterns()
 
-            self.vip.config.set("override_patterns", dumps(patterns))
+    def _failsafe_revert(self, name):
+        """
+        Revert all points of an overridden device
+        :param name: device path
+        :type name: str
+        """
+        driver = self.instances.get(name)
+        if driver is None:
+            return
+        try:
+            driver.revert_all()
+        except Exception as e:
+            _log.error("Failsafe revert failed for %s: %s", name, e)
 
     @RPC.export
     def set_override_off(self, pattern):
@@ -669,7 +681,7 @@ class PlatformDriverAgent(Agent):
         self._override_interval_events.clear()
         self._override_devices.clear()
         self._override_patterns.clear()
-        self.vip.config.set("override_patterns", {})
+        self._store_override_patterns()
 
     @RPC.export
     def get_override_patterns(self):
@@ -692,24 +704,27 @@ class PlatformDriverAgent(Agent):
             # Cancel any pending override events
             self._cancel_override_events(pattern)
             self._override_devices.clear()
-            patterns = dict()
             # Build override devices list again
             for pat in self._override_patterns:
-                for device in self.instances:
-                    if fnmatch.fnmatch(device, pat):
-                        self._override_devices.add(device)
+                self._override_devices.update(fnmatch.filter(self.instances, pat))
 
-                if self._override_interval_events[pat] is None:
-                    patterns[pat] = str(0.0)
-                else:
-                    evt, end_time = self._override_interval_events[pat]
-                    patterns[pat] = format_timestamp(end_time)
-
-            self.vip.config.set("override_patterns", dumps(patterns))
+            self._store_override_patterns()
         else:
             _log.error("Override Pattern did not match!")
             raise OverrideError(
-                "Pattern {} does not exist in list of override patterns".format(pattern))
+                f"Pattern {pattern} does not exist in list of override patterns")
+
+    def _store_override_patterns(self):
+        """
+        Save the current override patterns and their end times in the config store. Patterns with
+        indefinite duration are stored with an end time of "0.0".
+        """
+        events = self._override_interval_events
+        patterns = {
+            pat: str(0.0) if events[pat] is None else format_timestamp(events[pat][1])
+            for pat in self._override_patterns
+        }
+        self.vip.config.set("override_patterns", dumps(patterns))
 
     def _update_override_interval(self, interval, pattern):
         """Schedules a new override event for the specified interval and pattern. If the pattern already exists and new
@@ -791,6 +806,17 @@ class PlatformDriverAgent(Agent):
             if device in self._override_devices:
                 self._override_devices.remove(device)
 
+    def _raise_on_override(self, path, action):
+        """
+        Raise OverrideError if the device is under a global override condition.
+        :param path: device path
+        :type path: str
+        :param action: description of the blocked action, used in the error message
+        :type action: str
+        """
+        if path in self._override_devices:
+            raise OverrideError(f"Cannot {action} {path} since global override is set")
+
     @RPC.export
     def forward_bacnet_cov_value(self, source_address, point_name, point_values):
         """
@@ -800,9 +826,10 @@ class PlatformDriverAgent(Agent):
         :param point_name: name of the point in the COV notification
         :param point_values: dictionary of updated values sent by the device
         """
-        for driver in self.instances.values():
-            if driver.device_path == source_address:
-                driver.publish_cov_value(point_name, point_values)
+        # Drivers are keyed by their device path, so no scan is needed.
+        driver = self.instances.get(source_address)
+        if driver is not None:
+            driver.publish_cov_value(point_name, point_values)
 
 
 def main(argv=sys.argv):
@@ -48,6 +48,44 @@ def test_set_override_on_should_succeed(pattern, expected_device_override):
         platform_driver_agent.vip.config.set.assert_called_once()
 
 
+def test_set_override_on_should_spawn_device_revert():
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent.set_override_on("campus/building1/*")
+
+        platform_driver_agent.core.spawn.assert_called_with(platform_driver_agent._failsafe_revert,
+                                                            "campus/building1/")
+
+
+def test_staggered_revert_should_reach_replaced_driver():
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent.set_override_on("campus/building1/*", staggered_revert=True)
+        delay, revert, name = platform_driver_agent.core.spawn_later.call_args[0]
+        old_driver = platform_driver_agent.instances[name]
+        platform_driver_agent.instances[name] = MockedInstance()
+
+        revert(name)
+
+        assert delay == 0.05
+        assert old_driver.reverts == 0
+        assert platform_driver_agent.instances[name].reverts == 1
+
+
+def test_failsafe_revert_should_skip_removed_device():
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent._failsafe_revert("campus/building2/")
+
+        assert platform_driver_agent.instances["campus/building1/"].reverts == 0
+
+
+def test_failsafe_revert_should_log_device_failure(caplog):
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent.instances["campus/building1/"] = FailingInstance()
+
+        platform_driver_agent._failsafe_revert("campus/building1/")
+
+        assert "Failsafe revert failed for campus/building1/: device offline" in caplog.text
+
+
 def test_set_override_on_should_succeed_on_definite_duration():
     pattern = "campus/building1/*"
     duration = 42.9
@@ -83,6 +121,31 @@ def test_set_override_off_should_raise_override_error():
             platform_driver_agent.set_override_off(pattern)
 
 
+def test_set_point_should_raise_override_error_on_overridden_device():
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent._override_devices = {"campus/building1/"}
+
+        with pytest.raises(OverrideError):
+            platform_driver_agent.set_point("campus/building1/", "point", 42)
+
+
+def test_heart_beat_should_reach_every_device():
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent.heart_beat()
+
+        assert platform_driver_agent.instances["campus/building1/"].heart_beats == 1
+
+
+def test_heart_beat_should_log_device_failure(caplog):
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent.instances["campus/building2/"] = FailingInstance()
+
+        platform_driver_agent.heart_beat()
+
+        assert platform_driver_agent.instances["campus/building1/"].heart_beats == 1
+        assert "Heartbeat failed for campus/building2/: device offline" in caplog.text
+
+
 def test_derive_device_topic_should_succeed():
     config_name = "mytopic/foobar_topic"
     expected_result = "foobar_topic"
@@ -92,6 +155,12 @@ def test_derive_device_topic_should_succeed():
         assert result == expected_result
 
 
+def test_derive_device_topic_should_raise_on_config_name_without_prefix():
+    with pdriver() as platform_driver_agent:
+        with pytest.raises(ValueError):
+            platform_driver_agent.derive_device_topic("foobar_topic")
+
+
 def test_stop_driver_should_return_none():
     device_topic = "mytopic/foobar_topic"
 
@@ -99,6 +168,25 @@ def test_stop_driver_should_return_none():
         assert platform_driver_agent.stop_driver(device_topic) is None
 
 
+def test_update_driver_should_reuse_lowest_freed_slot_first(monkeypatch):
+    monkeypatch.setattr("platform_driver.agent.DriverAgent", ScheduledInstance)
+
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent.instances = {}
+        for n in range(5):
+            platform_driver_agent.update_driver(f"devices/campus/device{n}", "NEW", {})
+        for n in (3, 1, 2):
+            platform_driver_agent.stop_driver(f"campus/device{n}")
+
+        platform_driver_agent.update_driver("devices/campus/device5", "NEW", {})
+        platform_driver_agent.update_driver("devices/campus/device6", "NEW", {})
+
+        assert platform_driver_agent.instances["campus/device5"].time_slot == 1
+        assert platform_driver_agent.instances["campus/device6"].time_slot == 2
+        assert platform_driver_agent.freed_time_slots[0] == [3]
+        assert platform_driver_agent.group_counts[0] == 4
+
+
 def test_scrape_starting_should_return_none_on_false_scalability_test():
     topic = "mytopic/foobar"
 
@@ -147,6 +235,57 @@ def test_clear_overrides():
         assert len(platform_driver_agent._override_interval_events) == 0
         assert len(platform_driver_agent._override_devices) == 0
         assert len(platform_driver_agent._override_patterns) == 0
+        platform_driver_agent.vip.config.set.assert_called_once_with("override_patterns", "{}")
+
+
+def test_configure_main_should_skip_unchanged_update():
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent._main_config = dict(platform_driver_agent.default_config)
+        # Differs from the stored config, so only the early return keeps drivers untouched.
+        platform_driver_agent.publish_depth_first = True
+
+        platform_driver_agent.configure_main("config", "UPDATE", {})
+
+        assert platform_driver_agent.instances["campus/building1/"].publish_types is None
+
+
+def test_configure_main_should_push_changed_publish_types():
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent.configure_main("config", "UPDATE", {"publish_depth_first": True})
+
+        assert platform_driver_agent.instances["campus/building1/"].publish_types == (True, False,
+                                                                                      True, False)
+
+
+def test_configure_main_should_not_push_unchanged_publish_types():
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent.configure_main("config", "UPDATE",
+                                             {"scalability_test_iterations": 5})
+
+        assert platform_driver_agent._main_config["scalability_test_iterations"] == 5
+        assert platform_driver_agent.instances["campus/building1/"].publish_types is None
+
+
+def test_configure_main_should_keep_scrape_interval_on_invalid_update():
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent.configure_main("config", "UPDATE",
+                                             {"driver_scrape_interval": "fast"})
+
+        assert platform_driver_agent.driver_scrape_interval == 0.02
+
+
+def test_forward_bacnet_cov_value_should_publish_on_matching_device():
+    point_values = {"PresentValue": 42}
+
+    with pdriver() as platform_driver_agent:
+        platform_driver_agent.forward_bacnet_cov_value("campus/building1/", "point",
+                                                       point_values)
+        platform_driver_agent.forward_bacnet_cov_value("wrongcampus/building", "point",
+                                                       point_values)
+
+        assert platform_driver_agent.instances["campus/building1/"].cov_values == [
+            ("point", point_values)
+        ]
 
 
 @contextlib.contextmanager
@@ -170,6 +309,9 @@ def pdriver(override_patterns: set = set(),
         platform_driver_agent = PlatformDriverAgent(driver_config)
 
     platform_driver_agent._override_patterns = override_patterns
+    # Restart-only settings that a NEW configure_main would have set
+    platform_driver_agent.max_open_sockets = None
+    platform_driver_agent.max_concurrent_publishes = 10000
     platform_driver_agent.instances = {"campus/building1/": MockedInstance()}
     platform_driver_agent.core.spawn_return_value = None
     platform_driver_agent._override_interval_events = override_interval_events
@@ -192,5 +334,45 @@ def pdriver(override_patterns: set = set(),
 
 class MockedInstance:
 
+    publish_types = None
+
+    def __init__(self):
+        self.cov_values = []
+        self.heart_beats = 0
+        self.reverts = 0
+
     def revert_all(self):
+        self.reverts += 1
+
+    def heart_beat(self):
+        self.heart_beats += 1
+
+    def update_publish_types(self, *publish_types):
+        self.publish_types = publish_types
+
+    def publish_cov_value(self, point_name, point_values):
+        self.cov_values.append((point_name, point_values))
+
+
+class FailingInstance:
+
+    def revert_all(self):
+        raise RuntimeError("device offline")
+
+    def heart_beat(self):
+        raise RuntimeError("device offline")
+
+
+class ScheduledInstance:
+
+    def __init__(self, parent, config, time_slot, driver_scrape_interval, device_path, group,
+                 *args):
+        self.time_slot = time_slot
+        self.group = group
+        self.core = self
+
+    def run(self):
+        pass
+
+    def stop(self, timeout=None):
         pass